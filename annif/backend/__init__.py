@@ -2,121 +2,106 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Type
+import functools
+import importlib
+import importlib.util
+from typing import TYPE_CHECKING, Any, Type
 
 if TYPE_CHECKING:
     from annif.backend.backend import AnnifBackend
 
 
-# define functions for lazily importing each backend (alphabetical order)
-def _dummy() -> Type[AnnifBackend]:
-    from . import dummy
-
-    return dummy.DummyBackend
-
-
-def _ensemble() -> Type[AnnifBackend]:
-    from . import ensemble
-
-    return ensemble.EnsembleBackend
-
-
-def _fasttext() -> Type[AnnifBackend]:
-    try:
-        from . import fasttext
-
-        return fasttext.FastTextBackend
-    except ImportError:
-        raise ValueError("fastText not available, cannot use fasttext backend")
-
-
-def _http() -> Type[AnnifBackend]:
-    from . import http
-
-    return http.HTTPBackend
-
-
-def _mllm() -> Type[AnnifBackend]:
-    from . import mllm
-
-    return mllm.MLLMBackend
-
-
-def _nn_ensemble() -> Type[AnnifBackend]:
-    try:
-        from . import nn_ensemble
-
-        return nn_ensemble.NNEnsembleBackend
-    except ImportError:
-        raise ValueError(
-            "Keras and TensorFlow not available, cannot use " + "nn_ensemble backend"
-        )
+# registry of backend types (alphabetical order), mapping each backend ID to
+# the module and class implementing it and, for backends that need optional
+# dependencies, the names of those packages and the message to report when
+# they are not installed
+_backends = {
+    "dummy": ("dummy", "DummyBackend", (), None),
+    "ensemble": ("ensemble", "EnsembleBackend", (), None),
+    "fasttext": (
+        "fasttext",
+        "FastTextBackend",
+        ("fasttext",),
+        "fastText not available, cannot use fasttext backend",
+    ),
+    "http": ("http", "HTTPBackend", (), None),
+    "mllm": ("mllm", "MLLMBackend", (), None),
+    "nn_ensemble": (
+        "nn_ensemble",
+        "NNEnsembleBackend",
+        ("keras", "lmdb", "tensorflow"),
+        "Keras and TensorFlow not available, cannot use nn_ensemble backend",
+    ),
+    "omikuji": (
+        "omikuji",
+        "OmikujiBackend",
+        ("omikuji",),
+        "Omikuji not available, cannot use omikuji backend",
+    ),
+    "pav": ("pav", "PAVBackend", (), None),
+    "stwfsa": (
+        "stwfsa",
+        "StwfsaBackend",
+        ("stwfsapy",),
+        "STWFSA not available, cannot use stwfsa backend",
+    ),
+    "svc": ("svc", "SVCBackend", (), None),
+    "tfidf": ("tfidf", "TFIDFBackend", (), None),
+    "yake": (
+        "yake",
+        "YakeBackend",
+        ("yake",),
+        "YAKE not available, cannot use yake backend",
+    ),
+}
 
 
-def _omikuji() -> Type[AnnifBackend]:
+# lazily import the backend module on first use and memoize the class
+@functools.lru_cache(maxsize=None)
+def _load_backend(
+    module_name: str,
+    class_name: str,
+    dependencies: tuple[str, ...],
+    missing_msg: str | None,
+) -> Type[AnnifBackend]:
     try:
-        from . import omikuji
-
-        return omikuji.OmikujiBackend
+        module = importlib.import_module(f".{module_name}", __package__)
     except ImportError:
-        raise ValueError("Omikuji not available, cannot use omikuji backend")
-
-
-def _pav() -> Type[AnnifBackend]:
-    from . import pav
+        if missing_msg is None:
+            raise
+        raise ValueError(missing_msg)
+    return getattr(module, class_name)
 
-    return pav.PAVBackend
-
-
-def _stwfsa() -> Type[AnnifBackend]:
-    try:
-        from . import stwfsa
-
-        return stwfsa.StwfsaBackend
-    except ImportError:
-        raise ValueError("STWFSA not available, cannot use stwfsa backend")
 
+class _LazyBackend:
+    """Stand-in for a backend class that defers importing the backend module,
+    along with its possibly heavy dependencies, until the class is
+    instantiated or its attributes are accessed"""
 
-def _svc() -> Type[AnnifBackend]:
-    from . import svc
+    def __init__(self, backend: tuple) -> None:
+        self._backend = backend
 
-    return svc.SVCBackend
+    def _resolve(self) -> Type[AnnifBackend]:
+        return _load_backend(*self._backend)
 
+    def __call__(self, *args, **kwargs) -> AnnifBackend:
+        return self._resolve()(*args, **kwargs)
 
-def _tfidf() -> Type[AnnifBackend]:
-    from . import tfidf
-
-    return tfidf.TFIDFBackend
-
-
-def _yake() -> Type[AnnifBackend]:
-    try:
-        from . import yake
-
-        return yake.YakeBackend
-    except ImportError:
-        raise ValueError("YAKE not available, cannot use yake backend")
-
-
-# registry of the above functions
-_backend_fns = {
-    "dummy": _dummy,
-    "ensemble": _ensemble,
-    "fasttext": _fasttext,
-    "http": _http,
-    "mllm": _mllm,
-    "nn_ensemble": _nn_ensemble,
-    "omikuji": _omikuji,
-    "pav": _pav,
-    "stwfsa": _stwfsa,
-    "svc": _svc,
-    "tfidf": _tfidf,
-    "yake": _yake,
-}
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
 
 
-def get_backend(backend_id: str) -> Type[AnnifBackend]:
-    if backend_id in _backend_fns:
-        return _backend_fns[backend_id]()
-    else:
+# backend types are effectively singletons, so the proxies and the results of
+# the dependency checks can be reused by all callers
+@functools.lru_cache(maxsize=None)
+def get_backend(backend_id: str) -> _LazyBackend:
+    backend = _backends.get(backend_id)
+    if backend is None:
         raise ValueError("No such backend type {}".format(backend_id))
+    _, _, dependencies, missing_msg = backend
+    # check that optional dependencies are installed without importing them
+    if not all(importlib.util.find_spec(dep) for dep in dependencies):
+        raise ValueError(missing_msg)
+    return _LazyBackend(backend)
@@ -127,9 +127,9 @@ class EnsembleOptimizer(hyperopt.HyperparameterOptimizer):
             project_id: trial.suggest_float(project_id, 0.0, 1.0)
             for project_id in self._sources
         }
+        weights = [proj_weights[project_id] for project_id in self._sources]
         for gold_batch, src_batches in zip(self._gold_batches, self._source_batches):
             batches = [src_batches[project_id] for project_id in self._sources]
-            weights = [proj_weights[project_id] for project_id in self._sources]
             avg_batch = SuggestionBatch.from_averaged(batches, weights).filter(
                 limit=int(self._backend.params["limit"])
             )
@@ -52,16 +52,22 @@ class MLLMOptimizer(hyperopt.HyperparameterOptimizer):
         model = self._backend._model._create_classifier(params)
         model.fit(self._train_x, self._train_y)
 
-        batch = annif.eval.EvaluationBatch(self._backend.project.subjects)
-        for goldsubj, candidates in zip(self._gold_subjects, self._candidates):
+        suggestions = []
+        for candidates in self._candidates:
             if candidates:
                 features = self._backend._model._candidates_to_features(candidates)
                 scores = model.predict_proba(features)
                 ranking = self._backend._model._prediction_to_list(scores, candidates)
             else:
                 ranking = []
-            results = self._backend._prediction_to_result(ranking, params)
-            batch.evaluate_many([results], [goldsubj])
+            # materialize the top suggestions so the full score vector is freed
+            suggestions.append(
+                list(self._backend._prediction_to_result(ranking, params))
+            )
+
+        # evaluate all documents as a single batch
+        batch = annif.eval.EvaluationBatch(self._backend.project.subjects)
+        batch.evaluate_many(suggestions, self._gold_subjects)
         results = batch.results(metrics=[self._metric])
         return results[self._metric]
 
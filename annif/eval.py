@@ -2,15 +2,15 @@
 
 from __future__ import annotations
 
-import warnings
+import functools
+import itertools
 from typing import TYPE_CHECKING
 
 import numpy as np
 import scipy.sparse
-from sklearn.metrics import f1_score, precision_score, recall_score
 
 from annif.exception import NotSupportedException
-from annif.suggestion import SuggestionBatch, filter_suggestion
+from annif.suggestion import SuggestionBatch, filter_suggestion, rank_suggestions
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Iterator, Sequence
@@ -41,36 +41,133 @@ def false_negatives(y_true: csr_array, y_pred: csr_array) -> int:
     return int((y_true > y_pred).sum())
 
 
+def _doc_confusion_counts(
+    y_true: csr_array, y_pred: csr_array
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """calculate the numbers of true positives, false positives and false
+    negatives of each document for binary label arrays; the latter two are
+    derived from the numbers of predicted and relevant labels per document"""
+    tp = np.asarray(y_true.multiply(y_pred).sum(axis=1), dtype=np.int64)
+    n_pred = np.asarray(y_pred.sum(axis=1), dtype=np.int64)
+    n_true = np.asarray(y_true.sum(axis=1), dtype=np.int64)
+    return tp, n_pred - tp, n_true - tp
+
+
+def _subj_confusion_counts(
+    y_true: csr_array, y_pred: csr_array
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """calculate the numbers of true positives, false positives and false
+    negatives of each subject for binary label arrays"""
+    # transposing a CSR array gives a CSC view without copying the data
+    return _doc_confusion_counts(y_true.T, y_pred.T)
+
+
+def _confusion_counts(y_true: csr_array, y_pred: csr_array) -> tuple[int, int, int]:
+    """calculate the total numbers of true positives, false positives and
+    false negatives for binary label arrays at once"""
+    return tuple(int(counts.sum()) for counts in _doc_confusion_counts(y_true, y_pred))
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """divide elementwise, resulting in zero where the denominator is zero
+    like the sklearn metric functions do by default"""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(numerator.shape, dtype=np.float64),
+        where=denominator > 0,
+    )
+
+
+def _prf_scores(
+    tp: np.ndarray,
+    fp: np.ndarray,
+    fn: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> tuple[float, float, float]:
+    """calculate the precision, recall and F1 score from arrays of confusion
+    counts, averaged over the array elements using the given weights"""
+    precision = _divide(tp, tp + fp)
+    recall = _divide(tp, tp + fn)
+    f1 = _divide(2 * tp, 2 * tp + fp + fn)
+    return tuple(
+        float(np.average(scores, weights=weights)) for scores in (precision, recall, f1)
+    )
+
+
+def _samples_scores(y_true: csr_array, y_pred: csr_array) -> tuple[float, float, float]:
+    """calculate the precision, recall and F1 score averaged over documents
+    (equivalent to average="samples" in sklearn) from the per-document
+    confusion counts of binary label arrays"""
+    return _prf_scores(*_doc_confusion_counts(y_true, y_pred))
+
+
+def _subj_scores(
+    y_true: csr_array, y_pred: csr_array
+) -> dict[str, tuple[float, float, float]]:
+    """calculate the precision, recall and F1 score for binary label arrays
+    using the subject based averaging methods of sklearn ("macro",
+    "weighted" and "micro") from the per-subject confusion counts"""
+    tp, fp, fn = _subj_confusion_counts(y_true, y_pred)
+    support = tp + fn
+    return {
+        "macro": _prf_scores(tp, fp, fn),
+        # like sklearn, ignore the weights if no subject has any support
+        "weighted": _prf_scores(tp, fp, fn, support if support.any() else None),
+        "micro": _prf_scores(*(counts.sum(keepdims=True) for counts in (tp, fp, fn))),
+    }
+
+
+# logarithmic position discount factors used in DCG calculation, precomputed
+# for the most common list lengths and extended by _discount() when needed
+DCG_MAX_PRECOMPUTED = 1024
+_dcg_discount = 1.0 / np.log2(np.arange(2, DCG_MAX_PRECOMPUTED + 2))
+
+
+def _discount(length: int) -> np.ndarray:
+    """return the DCG discount factors for the given number of ranks"""
+    global _dcg_discount
+    if length > _dcg_discount.size:
+        _dcg_discount = 1.0 / np.log2(np.arange(2, length + 2))
+    return _dcg_discount[:length]
+
+
+def _dcg_scores(
+    y_true: csr_array, y_pred: csr_array, limit: int | None = None
+) -> np.ndarray:
+    """return the discounted cumulative gain (DCG) score of every row for
+    the selected labels vs. relevant labels"""
+
+    rows, order, ranks = rank_suggestions(y_pred)
+    keep = y_pred.data[order] != 0
+    if limit is not None:
+        keep &= ranks < limit
+    rows, cols, ranks = rows[keep], y_pred.indices[order[keep]], ranks[keep]
+
+    gain = y_true[rows, cols].astype(np.float64)
+    discount = _discount(ranks.max() + 1 if ranks.size else 0)
+    return np.bincount(rows, weights=gain * discount[ranks], minlength=y_pred.shape[0])
+
+
 def dcg_score(
     y_true: csr_array, y_pred: csr_array, limit: int | None = None
 ) -> np.float64:
     """return the discounted cumulative gain (DCG) score for the selected
     labels vs. relevant labels"""
 
-    n_pred = y_pred.count_nonzero()
-    if limit is not None:
-        n_pred = min(limit, n_pred)
-
-    top_k = y_pred.data.argsort()[-n_pred:][::-1]
-    order = y_pred.indices[top_k]
-    gain = y_true[:, order]
-    discount = np.log2(np.arange(1, n_pred + 1) + 1)
-    return (gain / discount).sum()
+    return _dcg_scores(y_true, y_pred, limit).sum()
 
 
 def ndcg_score(y_true: csr_array, y_pred: csr_array, limit: int | None = None) -> float:
     """return the normalized discounted cumulative gain (nDCG) score for the
     selected labels vs. relevant labels"""
 
-    scores = np.ones(y_true.shape[0], dtype=np.float32)
-    for i in range(y_true.shape[0]):
-        true = y_true[[i]]
-        idcg = dcg_score(true, true, limit)
-        if idcg > 0:
-            pred = y_pred[[i]]
-            dcg = dcg_score(true, pred, limit)
-            scores[i] = dcg / idcg
-
+    # compute the DCG of all documents at once; the ideal DCG is obtained by
+    # ranking the relevant labels by their relevance
+    idcg = _dcg_scores(y_true, y_true, limit)
+    dcg = _dcg_scores(y_true, y_pred, limit)
+    scores = np.ones(y_true.shape[0], dtype=np.float64)
+    np.divide(dcg, idcg, out=scores, where=idcg > 0)
     return float(scores.mean())
 
 
@@ -98,14 +195,23 @@ class EvaluationBatch:
             )
         self._suggestion_arrays.append(suggestion_batch.array)
 
-        # convert gold_subject_batch to sparse matrix
-        ar = scipy.sparse.dok_array(
-            (len(gold_subject_batch), len(self._subject_index)), dtype=bool
+        # convert gold_subject_batch to sparse matrix, building the CSR
+        # structure directly from the subject IDs of each document
+        indptr = np.zeros(len(gold_subject_batch) + 1, dtype=np.int32)
+        np.cumsum(
+            [len(subject_set) for subject_set in gold_subject_batch], out=indptr[1:]
+        )
+        indices = np.fromiter(
+            itertools.chain.from_iterable(gold_subject_batch),
+            dtype=np.int32,
+            count=indptr[-1],
         )
-        for idx, subject_set in enumerate(gold_subject_batch):
-            for subject_id in subject_set:
-                ar[idx, subject_id] = True
-        self._gold_subject_arrays.append(ar.tocsr())
+        ar = scipy.sparse.csr_array(
+            (np.ones(indices.size, dtype=bool), indices, indptr),
+            shape=(len(gold_subject_batch), len(self._subject_index)),
+        )
+        ar.sum_duplicates()
+        self._gold_subject_arrays.append(ar)
 
     def _evaluate_samples(
         self,
@@ -114,73 +220,51 @@ class EvaluationBatch:
         metrics: Iterable[str] = [],
     ) -> dict[str, float]:
         y_pred_binary = y_pred > 0.0
+        confusion = functools.cache(lambda: _confusion_counts(y_true, y_pred_binary))
+        # binarized top-K predictions are shared between the @K metrics
+        y_pred_top = functools.cache(
+            lambda limit: filter_suggestion(y_pred, limit) > 0.0
+        )
+        # subject averaged (precision, recall, F1) for the different modes
+        subj = functools.cache(lambda: _subj_scores(y_true, y_pred_binary))
+        # document averaged (precision, recall, F1) for all or top-K predictions
+        samples = functools.cache(
+            lambda limit=None: _samples_scores(
+                y_true, y_pred_binary if limit is None else y_pred_top(limit)
+            )
+        )
 
         # define the available metrics as lazy lambda functions
         # so we can execute only the ones actually requested
         all_metrics = {
-            "Precision (doc avg)": lambda: precision_score(
-                y_true, y_pred_binary, average="samples"
-            ),
-            "Recall (doc avg)": lambda: recall_score(
-                y_true, y_pred_binary, average="samples"
-            ),
-            "F1 score (doc avg)": lambda: f1_score(
-                y_true, y_pred_binary, average="samples"
-            ),
-            "Precision (subj avg)": lambda: precision_score(
-                y_true, y_pred_binary, average="macro"
-            ),
-            "Recall (subj avg)": lambda: recall_score(
-                y_true, y_pred_binary, average="macro"
-            ),
-            "F1 score (subj avg)": lambda: f1_score(
-                y_true, y_pred_binary, average="macro"
-            ),
-            "Precision (weighted subj avg)": lambda: precision_score(
-                y_true, y_pred_binary, average="weighted"
-            ),
-            "Recall (weighted subj avg)": lambda: recall_score(
-                y_true, y_pred_binary, average="weighted"
-            ),
-            "F1 score (weighted subj avg)": lambda: f1_score(
-                y_true, y_pred_binary, average="weighted"
-            ),
-            "Precision (microavg)": lambda: precision_score(
-                y_true, y_pred_binary, average="micro"
-            ),
-            "Recall (microavg)": lambda: recall_score(
-                y_true, y_pred_binary, average="micro"
-            ),
-            "F1 score (microavg)": lambda: f1_score(
-                y_true, y_pred_binary, average="micro"
-            ),
-            "F1@5": lambda: f1_score(
-                y_true, filter_suggestion(y_pred, 5) > 0.0, average="samples"
-            ),
+            "Precision (doc avg)": lambda: samples()[0],
+            "Recall (doc avg)": lambda: samples()[1],
+            "F1 score (doc avg)": lambda: samples()[2],
+            "Precision (subj avg)": lambda: subj()["macro"][0],
+            "Recall (subj avg)": lambda: subj()["macro"][1],
+            "F1 score (subj avg)": lambda: subj()["macro"][2],
+            "Precision (weighted subj avg)": lambda: subj()["weighted"][0],
+            "Recall (weighted subj avg)": lambda: subj()["weighted"][1],
+            "F1 score (weighted subj avg)": lambda: subj()["weighted"][2],
+            "Precision (microavg)": lambda: subj()["micro"][0],
+            "Recall (microavg)": lambda: subj()["micro"][1],
+            "F1 score (microavg)": lambda: subj()["micro"][2],
+            "F1@5": lambda: samples(5)[2],
             "NDCG": lambda: ndcg_score(y_true, y_pred),
             "NDCG@5": lambda: ndcg_score(y_true, y_pred, limit=5),
             "NDCG@10": lambda: ndcg_score(y_true, y_pred, limit=10),
-            "Precision@1": lambda: precision_score(
-                y_true, filter_suggestion(y_pred, 1) > 0.0, average="samples"
-            ),
-            "Precision@3": lambda: precision_score(
-                y_true, filter_suggestion(y_pred, 3) > 0.0, average="samples"
-            ),
-            "Precision@5": lambda: precision_score(
-                y_true, filter_suggestion(y_pred, 5) > 0.0, average="samples"
-            ),
-            "True positives": lambda: true_positives(y_true, y_pred_binary),
-            "False positives": lambda: false_positives(y_true, y_pred_binary),
-            "False negatives": lambda: false_negatives(y_true, y_pred_binary),
+            "Precision@1": lambda: samples(1)[0],
+            "Precision@3": lambda: samples(3)[0],
+            "Precision@5": lambda: samples(5)[0],
+            "True positives": lambda: confusion()[0],
+            "False positives": lambda: confusion()[1],
+            "False negatives": lambda: confusion()[2],
         }
 
         if not metrics:
             metrics = all_metrics.keys()
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-
-            return {metric: all_metrics[metric]() for metric in metrics}
+        return {metric: all_metrics[metric]() for metric in metrics}
 
     def _result_per_subject_header(
         self, results_file: LazyFile | TextIOWrapper
@@ -218,12 +302,7 @@ class EvaluationBatch:
         """Write results per subject (non-aggregated)
         to outputfile results_file, using labels in the given language"""
 
-        y_pred = y_pred.T > 0.0
-        y_true = y_true.T
-
-        true_pos = y_true.multiply(y_pred).sum(axis=1)
-        false_pos = (y_true < y_pred).sum(axis=1)
-        false_neg = (y_true > y_pred).sum(axis=1)
+        true_pos, false_pos, false_neg = _subj_confusion_counts(y_true, y_pred > 0.0)
 
         with np.errstate(invalid="ignore"):
             precision = np.nan_to_num(true_pos / (true_pos + false_pos))
@@ -233,7 +312,7 @@ class EvaluationBatch:
         zipped = zip(
             [subj.uri for subj in self._subject_index],  # URI
             [subj.labels[language] for subj in self._subject_index],  # Label
-            y_true.sum(axis=1),  # Support
+            true_pos + false_neg,  # Support
             true_pos,  # True positives
             false_pos,  # False positives
             false_neg,  # False negatives
@@ -255,7 +334,7 @@ class EvaluationBatch:
         If results_file (file object) given, write results per subject to it
         with labels expressed in the given language."""
 
-        if not self._suggestion_arrays:
+        if not any(array.shape[0] for array in self._suggestion_arrays):
             raise NotSupportedException("cannot evaluate empty corpus")
 
         y_pred = scipy.sparse.csr_array(scipy.sparse.vstack(self._suggestion_arrays))
@@ -5,7 +5,6 @@ from __future__ import annotations
 import collections
 import math
 from enum import IntEnum
-from statistics import mean
 from typing import TYPE_CHECKING, Any
 
 import joblib
@@ -67,9 +66,9 @@ def conflate_matches(matches: list[Match], doc_length: int) -> list[Candidate]:
             doc_length=doc_length,
             subject_id=subject_id,
             freq=len(matches) / doc_length,
-            is_pref=mean((float(m.is_pref) for m in matches)),
-            n_tokens=mean((m.n_tokens for m in matches)),
-            ambiguity=mean((m.ambiguity for m in matches)),
+            is_pref=sum(m.is_pref for m in matches) / len(matches),
+            n_tokens=sum(m.n_tokens for m in matches) / len(matches),
+            ambiguity=sum(m.ambiguity for m in matches) / len(matches),
             first_occ=matches[0].pos / doc_length,
             last_occ=matches[-1].pos / doc_length,
             spread=(matches[-1].pos - matches[0].pos) / doc_length,
@@ -25,6 +25,21 @@ def vector_to_suggestions(vector: np.ndarray, limit: int) -> Iterator:
     )
 
 
+def rank_suggestions(
+    preds: csr_array,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """rank the entries of a 2D sparse suggestion array (csr_array) by
+    descending score within each row. Return the row and the position in
+    the data/indices arrays of every entry, sorted by row and descending
+    score, along with the rank of each entry in its row (0 for the best)"""
+
+    rows = np.repeat(np.arange(preds.shape[0]), np.diff(preds.indptr))
+    order = np.lexsort((-preds.data.astype(np.float64), rows))
+    rows = rows[order]
+    ranks = np.arange(order.size) - preds.indptr[rows]
+    return rows, order, ranks
+
+
 def filter_suggestion(
     preds: csr_array,
     limit: int | None = None,
@@ -37,19 +52,16 @@ def filter_suggestion(
     if limit == 0:
         return csr_array(preds.shape, dtype=np.float32)  # empty
 
-    data, rows, cols = [], [], []
-    for row in range(preds.shape[0]):
-        arow = preds[[row]]
-        if limit is not None and limit < len(arow.data):
-            topk_idx = arow.data.argpartition(-limit)[-limit:]
-        else:
-            topk_idx = range(len(arow.data))
-        for idx in topk_idx:
-            if arow.data[idx] >= threshold:
-                data.append(arow.data[idx])
-                rows.append(row)
-                cols.append(arow.indices[idx])
-    return csr_array((data, (rows, cols)), shape=preds.shape, dtype=np.float32)
+    rows, order, ranks = rank_suggestions(preds)
+    keep = preds.data[order] >= threshold
+    if limit is not None:
+        keep &= ranks < limit
+    order = order[keep]
+    return csr_array(
+        (preds.data[order], (rows[keep], preds.indices[order])),
+        shape=preds.shape,
+        dtype=np.float32,
+    )
 
 
 class SuggestionResult:
@@ -95,18 +107,21 @@ class SuggestionBatch:
         """Create a new SuggestionBatch from a sequence where each item is
         a sequence of SubjectSuggestion objects."""
 
-        deprecated = set(subject_index.deprecated_ids())
-        data, rows, cols = [], [], []
+        rows, cols, scores = [], [], []
         for idx, result in enumerate(suggestion_results):
             for suggestion in itertools.islice(result, limit):
-                if suggestion.subject_id in deprecated or suggestion.score <= 0.0:
-                    continue
-                data.append(min(suggestion.score, 1.0))
                 rows.append(idx)
                 cols.append(suggestion.subject_id)
+                scores.append(suggestion.score)
+
+        # filter out deprecated subjects and non-positive scores as arrays
+        rows = np.array(rows, dtype=np.int32)
+        cols = np.array(cols, dtype=np.int32)
+        scores = np.array(scores, dtype=np.float64)
+        keep = (scores > 0.0) & ~np.isin(cols, subject_index.deprecated_ids())
         return cls(
             csr_array(
-                (data, (rows, cols)),
+                (np.minimum(scores[keep], 1.0), (rows[keep], cols[keep])),
                 shape=(len(suggestion_results), len(subject_index)),
                 dtype=np.float32,
             )
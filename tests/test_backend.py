@@ -6,6 +6,7 @@ import pytest
 
 import annif
 import annif.backend
+import annif.backend.dummy
 import annif.corpus
 
 
@@ -24,6 +25,24 @@ def test_get_backend_dummy(project, dummy_subject_index):
     assert hits[0].score == 1.0
 
 
+def test_get_backend_cached():
+    assert annif.backend.get_backend("dummy") is annif.backend.get_backend("dummy")
+
+
+def test_get_backend_deferred_import(monkeypatch):
+    loaded = []
+
+    def load_backend(*backend):
+        loaded.append(backend)
+        return annif.backend.dummy.DummyBackend
+
+    monkeypatch.setattr(annif.backend, "_load_backend", load_backend)
+    dummy_type = annif.backend.get_backend("dummy")
+    assert loaded == []
+    assert dummy_type.name == "dummy"
+    assert len(loaded) == 1
+
+
 def test_learn_dummy(project, tmpdir):
     dummy_type = annif.backend.get_backend("dummy")
     dummy = dummy_type(backend_id="dummy", config_params={}, project=project)
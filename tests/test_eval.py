@@ -43,6 +43,47 @@ def test_false_negatives():
     assert fn2 == 2
 
 
+def test_confusion_counts():
+    y_true = csr_array([[True, False, True, False, True, False]])
+    y_pred = csr_array([[True, True, False, True, True, False]])
+    assert annif.eval._confusion_counts(y_true, y_pred) == (2, 2, 1)
+
+    y_true = csr_array([[True, True, False, True, True, False]])
+    y_pred = csr_array([[True, False, True, True, False, False]])
+    assert annif.eval._confusion_counts(y_true, y_pred) == (2, 1, 2)
+
+
+def test_doc_confusion_counts():
+    y_true = csr_array(
+        [[True, False, True, False], [True, True, False, False], [False] * 4]
+    )
+    y_pred = csr_array(
+        [[True, True, False, False], [True, True, False, True], [True] + [False] * 3]
+    )
+    tp, fp, fn = annif.eval._doc_confusion_counts(y_true, y_pred)
+    assert tp.tolist() == [1, 2, 0]
+    assert fp.tolist() == [1, 1, 1]
+    assert fn.tolist() == [1, 0, 0]
+
+
+def test_samples_scores():
+    y_true = csr_array([[True, False, True, False], [True, True, False, False]])
+    y_pred = csr_array([[True, True, False, False], [False, False, False, False]])
+    precision, recall, f1 = annif.eval._samples_scores(y_true, y_pred)
+    assert precision == 0.25
+    assert recall == 0.25
+    assert f1 == 0.25
+
+
+def test_subj_scores():
+    y_true = csr_array([[True, False, True, False], [True, True, False, False]])
+    y_pred = csr_array([[True, True, False, False], [True, False, False, True]])
+    scores = annif.eval._subj_scores(y_true, y_pred)
+    assert scores["macro"] == (0.25, 0.25, 0.25)
+    assert scores["weighted"] == (0.5, 0.5, 0.5)
+    assert scores["micro"] == (0.5, 0.5, 0.5)
+
+
 # DCG@6 example from https://en.wikipedia.org/wiki/Discounted_cumulative_gain
 def test_dcg():
     y_true = csr_array([[3, 2, 3, 0, 1, 2]])
@@ -9,6 +9,7 @@ from annif.suggestion import (
     SubjectSuggestion,
     SuggestionBatch,
     filter_suggestion,
+    rank_suggestions,
     vector_to_suggestions,
 )
 
@@ -46,6 +47,14 @@ def test_vector_to_suggestions_limit():
     ]
 
 
+def test_rank_suggestions():
+    pred = csr_array([[0, 1, 3, 2], [1, 4, 3, 0]])
+    rows, order, ranks = rank_suggestions(pred)
+    assert rows.tolist() == [0, 0, 0, 1, 1, 1]
+    assert pred.indices[order].tolist() == [2, 3, 1, 1, 2, 0]
+    assert ranks.tolist() == [0, 1, 2, 0, 1, 2]
+
+
 def test_filter_suggestion_limit():
     pred = csr_array([[0, 1, 3, 2], [1, 4, 3, 0]])
     filtered = filter_suggestion(pred, limit=2)